@@ -0,0 +1,29 @@
+-- Inspection findings table
+CREATE TABLE IF NOT EXISTS inspection_findings (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  external_id TEXT UNIQUE NOT NULL,
+  facility_id INTEGER NOT NULL,
+  category TEXT NOT NULL,
+  severity INTEGER NOT NULL DEFAULT 1,
+  description TEXT,
+  inspected_on DATE NOT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (facility_id) REFERENCES facilities (id)
+);
+
+-- Inspection finding rollups table (one row per facility, category and week/month,
+-- kept up to date as findings are ingested so the heatmap never scans raw findings)
+CREATE TABLE IF NOT EXISTS inspection_finding_rollups (
+  facility_id INTEGER NOT NULL,
+  category TEXT NOT NULL,
+  period_type TEXT NOT NULL,
+  period_start DATE NOT NULL,
+  finding_count INTEGER NOT NULL DEFAULT 0,
+  severity_total INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (facility_id, category, period_type, period_start),
+  FOREIGN KEY (facility_id) REFERENCES facilities (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_inspection_finding_rollups_period
+  ON inspection_finding_rollups (period_type, period_start);
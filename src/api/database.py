@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import logging
+from contextlib import closing
+
+# Define the database and migrations locations
+DATABASE_PATH = os.environ.get('DATABASE_PATH', '/home/ubuntu/care-home-saas/care-home-saas/care_home.db')
+MIGRATIONS_DIR = os.environ.get('MIGRATIONS_DIR', '/home/ubuntu/care-home-saas/care-home-saas/migrations')
+
+logger = logging.getLogger(__name__)
+
+def get_db_connection():
+    conn = sqlite3.connect(DATABASE_PATH)
+    # SQLite only enforces REFERENCES constraints when this is switched on
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def apply_migrations():
+    # Apply pending migrations in order, recording each one in schema_migrations
+    with closing(get_db_connection()) as conn:
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS schema_migrations (
+                 filename TEXT PRIMARY KEY,
+                 applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+               )"""
+        )
+        applied = {row[0] for row in conn.execute("SELECT filename FROM schema_migrations")}
+        
+        # Databases created from 0001 before tracking existed already have its tables
+        initial_schema = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+        ).fetchone()
+        if not applied and initial_schema:
+            conn.execute("INSERT INTO schema_migrations (filename) VALUES (?)", ('0001_initial.sql',))
+            applied.add('0001_initial.sql')
+        conn.commit()
+        
+        for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not filename.endswith('.sql') or filename in applied:
+                continue
+            with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                migration_sql = f.read()
+            
+            # Run the file and record it in one transaction so a failure leaves nothing behind
+            try:
+                conn.executescript("BEGIN;\n" + migration_sql)
+                conn.execute("INSERT INTO schema_migrations (filename) VALUES (?)", (filename,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info("Applied migration %s", filename)
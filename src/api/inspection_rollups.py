@@ -0,0 +1,69 @@
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+from database import get_db_connection
+
+# Granularities maintained in inspection_finding_rollups
+ROLLUP_PERIODS = ('week', 'month')
+
+def period_start(day: date, period: str) -> date:
+    # Weeks start on Monday, months on the first day of the month
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def period_end(day: date, period: str) -> date:
+    # Last day of the week or month containing the given day
+    if period == 'week':
+        return period_start(day, period) + timedelta(days=6)
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+def iter_period_starts(start: date, end: date, period: str) -> Iterator[date]:
+    # Every period start from the period containing start to the one containing end
+    current = period_start(start, period)
+    while current <= end:
+        yield current
+        current = period_end(current, period) + timedelta(days=1)
+
+def add_rollup_deltas(deltas: Dict[tuple, List[int]], facility_id: int, category: str,
+                      inspected_on: date, count: int, severity: int):
+    for period in ROLLUP_PERIODS:
+        key = (facility_id, category, period, period_start(inspected_on, period).isoformat())
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += count
+        delta[1] += severity
+
+def upsert_rollups(conn, deltas: Dict[tuple, List[int]]):
+    conn.executemany(
+        """INSERT INTO inspection_finding_rollups
+           (facility_id, category, period_type, period_start, finding_count, severity_total)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT (facility_id, category, period_type, period_start) DO UPDATE SET
+             finding_count = finding_count + excluded.finding_count,
+             severity_total = severity_total + excluded.severity_total,
+             updated_at = CURRENT_TIMESTAMP""",
+        [key + tuple(delta) for key, delta in deltas.items()]
+    )
+
+def rebuild_inspection_rollups(conn) -> int:
+    # Recompute every rollup from the raw findings, grouped by day to keep the scan small
+    deltas: Dict[tuple, List[int]] = {}
+    daily_totals = conn.execute(
+        """SELECT facility_id, category, inspected_on, COUNT(*), SUM(severity)
+           FROM inspection_findings
+           GROUP BY facility_id, category, inspected_on"""
+    )
+    for facility_id, category, inspected_on, count, severity in daily_totals:
+        add_rollup_deltas(deltas, facility_id, category, date.fromisoformat(inspected_on), count, severity)
+    
+    conn.execute("DELETE FROM inspection_finding_rollups")
+    upsert_rollups(conn, deltas)
+    return len(deltas)
+
+# Repair drifted rollups from the raw findings (maintenance task, scans every finding)
+if __name__ == "__main__":
+    with closing(get_db_connection()) as conn, conn:
+        rollups = rebuild_inspection_rollups(conn)
+    print(f"Rebuilt {rollups} inspection finding rollups")
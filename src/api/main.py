@@ -1,7 +1,7 @@
 import sys
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, conint, constr
 from typing import Optional, List, Dict, Any
 import os
 import json
@@ -10,6 +10,10 @@ import joblib
 import pandas as pd
 import tempfile
 import shutil
+import logging
+from contextlib import asynccontextmanager, closing
+from itertools import islice
+from datetime import date
 
 # Add the ML models directory to the path
 sys.path.append('/home/ubuntu/care-home-saas/care-home-saas/src/lib/ml-models')
@@ -23,8 +27,24 @@ from nurse_dictation_tool import get_nurse_dictation_tool
 from llm_support_agent import get_llm_support_agent
 # Note: meal_intake_model is imported separately due to its dependencies
 
+from database import get_db_connection, apply_migrations
+from inspection_rollups import (
+    ROLLUP_PERIODS, period_start, period_end, iter_period_starts, add_rollup_deltas, upsert_rollups
+)
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A migration failure only affects the database-backed endpoints
+    try:
+        apply_migrations()
+    except Exception:
+        logger.exception("Database migration failed")
+    yield
+
 # Create the FastAPI app
-app = FastAPI(title="Care Home SaaS API")
+app = FastAPI(title="Care Home SaaS API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -39,6 +59,12 @@ app.add_middleware(
 UPLOAD_DIR = '/home/ubuntu/care-home-saas/care-home-saas/uploads'
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Rollup granularities served by the inspection findings heatmap
+HEATMAP_PERIODS = ROLLUP_PERIODS
+HEATMAP_METRICS = {'count': 'finding_count', 'severity': 'severity_total'}
+HEATMAP_COLUMNS = ('category', 'period')
+HEATMAP_MAX_PERIODS = 104
+
 # Initialize the PDF summarizer
 pdf_summarizer = get_pdf_summarizer()
 
@@ -89,6 +115,17 @@ class LLMSupportRequest(BaseModel):
     scenario_type: str
     resident_id: Optional[int] = None
 
+class InspectionFinding(BaseModel):
+    external_id: constr(strip_whitespace=True, min_length=1)
+    facility_id: int
+    category: constr(strip_whitespace=True, min_length=1)
+    severity: conint(ge=1) = 1
+    description: Optional[str] = None
+    inspected_on: date
+
+class InspectionFindingsRequest(BaseModel):
+    findings: List[InspectionFinding]
+
 # API endpoints
 @app.get("/")
 async def root():
@@ -258,6 +295,145 @@ async def llm_support(request: LLMSupportRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/inspection-findings")
+def ingest_inspection_findings(request: InspectionFindingsRequest):
+    try:
+        with closing(get_db_connection()) as conn, conn:
+            # Reject the whole batch if it references facilities that do not exist
+            facility_ids = sorted({finding.facility_id for finding in request.findings})
+            known = {
+                row[0] for row in conn.execute(
+                    f"SELECT id FROM facilities WHERE id IN ({', '.join('?' * len(facility_ids))})",
+                    facility_ids
+                )
+            }
+            unknown = [facility_id for facility_id in facility_ids if facility_id not in known]
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Unknown facility_id values: {unknown}")
+            
+            # Findings already stored under the same external_id (e.g. a retried batch) are skipped
+            deltas: Dict[tuple, List[int]] = {}
+            inserted = 0
+            for finding in request.findings:
+                cursor = conn.execute(
+                    """INSERT INTO inspection_findings
+                       (external_id, facility_id, category, severity, description, inspected_on)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (external_id) DO NOTHING""",
+                    (
+                        finding.external_id,
+                        finding.facility_id,
+                        finding.category,
+                        finding.severity,
+                        finding.description,
+                        finding.inspected_on.isoformat()
+                    )
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                    add_rollup_deltas(
+                        deltas,
+                        finding.facility_id,
+                        finding.category,
+                        finding.inspected_on,
+                        1,
+                        finding.severity
+                    )
+            
+            # Update the rollups for the new findings in the same transaction
+            upsert_rollups(conn, deltas)
+        
+        return {
+            "inserted": inserted,
+            "duplicates": len(request.findings) - inserted,
+            "rollups_updated": len(deltas)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/inspection-findings/heatmap")
+def inspection_findings_heatmap(
+    period: str = 'month',
+    metric: str = 'count',
+    columns: str = 'category',
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None
+):
+    if period not in HEATMAP_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {list(HEATMAP_PERIODS)}")
+    if metric not in HEATMAP_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {list(HEATMAP_METRICS)}")
+    if columns not in HEATMAP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"columns must be one of {list(HEATMAP_COLUMNS)}")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if columns == 'period' and not (start and end):
+        raise HTTPException(status_code=400, detail="columns=period requires start and end")
+    
+    # start and end select whole periods, so they widen to the enclosing week or month
+    effective_start = period_start(start, period) if start else None
+    effective_end = period_end(end, period) if end else None
+    
+    # A time axis covers every period in the range, including ones without findings
+    period_axis = None
+    if columns == 'period':
+        period_axis = [
+            day.isoformat() for day in
+            islice(iter_period_starts(effective_start, effective_end, period), HEATMAP_MAX_PERIODS + 1)
+        ]
+        if len(period_axis) > HEATMAP_MAX_PERIODS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"columns=period supports at most {HEATMAP_MAX_PERIODS} periods"
+            )
+    
+    try:
+        # Read only from the rollups; raw findings are never scanned here
+        column_field = 'category' if columns == 'category' else 'period_start'
+        query = (
+            f"SELECT facility_id, {column_field}, SUM({HEATMAP_METRICS[metric]}) "
+            "FROM inspection_finding_rollups WHERE period_type = ?"
+        )
+        params: List[Any] = [period]
+        if effective_start:
+            query += " AND period_start >= ?"
+            params.append(effective_start.isoformat())
+        if effective_end:
+            query += " AND period_start <= ?"
+            params.append(effective_end.isoformat())
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        query += f" GROUP BY facility_id, {column_field}"
+        
+        with closing(get_db_connection()) as conn, conn:
+            cells = conn.execute(query, params).fetchall()
+        
+        # Build a dense row-major matrix: facilities as rows, categories or periods as columns
+        rows = sorted({facility_id for facility_id, _, _ in cells})
+        cols = period_axis if period_axis is not None else sorted({column for _, column, _ in cells})
+        row_index = {facility_id: i for i, facility_id in enumerate(rows)}
+        col_index = {column: j for j, column in enumerate(cols)}
+        values = [0] * (len(rows) * len(cols))
+        for facility_id, column, value in cells:
+            values[row_index[facility_id] * len(cols) + col_index[column]] = value
+        
+        return {
+            "period": period,
+            "metric": metric,
+            "columns_by": columns,
+            "start": effective_start.isoformat() if effective_start else None,
+            "end": effective_end.isoformat() if effective_end else None,
+            "rows": rows,
+            "columns": cols,
+            "values": values
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Run the API with uvicorn
 if __name__ == "__main__":
     import uvicorn
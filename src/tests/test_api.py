@@ -3,6 +3,9 @@ import requests
 import json
 import os
 import sys
+import sqlite3
+import tempfile
+import shutil
 
 # Add the project root to the path
 sys.path.append('/home/ubuntu/care-home-saas/care-home-saas')
@@ -133,10 +136,166 @@ class TestCareHomeSaaSAPI(unittest.TestCase):
         
         # Check that the scenario type matches the request
         self.assertEqual(data["scenario_type"], "ethical_dilemma")
-    
+
     def tearDown(self):
         """Clean up after each test"""
         pass
 
+class TestInspectionFindingsAPI(unittest.TestCase):
+    """Test cases for the inspection findings endpoints, run in-process against a temporary database"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Import the API once for all inspection findings tests"""
+        sys.path.append('/home/ubuntu/care-home-saas/care-home-saas/src/api')
+        from fastapi.testclient import TestClient
+        import database
+        import main
+        cls.TestClient = TestClient
+        cls.database = database
+        cls.app = main.app
+
+    def setUp(self):
+        """Point the API at an empty database; migrations run when the client starts"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_database_path = self.database.DATABASE_PATH
+        self.database.DATABASE_PATH = os.path.join(self.temp_dir, 'care_home.db')
+        self.client = self.TestClient(self.app)
+        self.client.__enter__()
+
+        # 0001 seeds facility 1; add a second facility for multi-row heatmaps
+        with sqlite3.connect(self.database.DATABASE_PATH) as conn:
+            conn.execute("INSERT INTO facilities (id, name) VALUES (2, 'Birch Grove Care Home')")
+
+    def ingest(self, findings):
+        """Ingest findings and return the response"""
+        return self.client.post("/api/inspection-findings", json={"findings": findings})
+
+    def ingest_sample_findings(self):
+        """Ingest findings in January and March 2020, leaving February empty"""
+        findings = [
+            {"external_id": "f-1", "facility_id": 1, "category": "infection_control", "severity": 3, "inspected_on": "2020-01-06"},
+            {"external_id": "f-2", "facility_id": 1, "category": "infection_control", "severity": 2, "inspected_on": "2020-01-20"},
+            {"external_id": "f-3", "facility_id": 1, "category": "medication", "severity": 1, "inspected_on": "2020-01-08"},
+            {"external_id": "f-4", "facility_id": 2, "category": "medication", "severity": 4, "inspected_on": "2020-03-30"}
+        ]
+        response = self.ingest(findings)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["inserted"], 4)
+        return findings
+
+    def get_heatmap(self, **params):
+        """Fetch the heatmap and return the response data and a {facility: {column: value}} view"""
+        response = self.client.get("/api/inspection-findings/heatmap", params=params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        # Check that the response is a dense row-major matrix
+        columns = data["columns"]
+        self.assertEqual(len(data["values"]), len(data["rows"]) * len(columns))
+
+        matrix = {}
+        for i, facility_id in enumerate(data["rows"]):
+            matrix[facility_id] = dict(zip(columns, data["values"][i * len(columns):(i + 1) * len(columns)]))
+        return data, matrix
+
+    def test_ingest_skips_duplicates(self):
+        """Test that a retried batch is not counted twice"""
+        findings = self.ingest_sample_findings()
+
+        response = self.ingest(findings)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["inserted"], 0)
+        self.assertEqual(response.json()["duplicates"], 4)
+
+        _, matrix = self.get_heatmap(start="2020-01-01", end="2020-01-31")
+        self.assertEqual(matrix[1], {"infection_control": 2, "medication": 1})
+
+    def test_heatmap_by_category(self):
+        """Test the monthly heatmap by category for the count and severity metrics"""
+        self.ingest_sample_findings()
+
+        data, matrix = self.get_heatmap(period="month", start="2020-01-15", end="2020-03-02")
+        self.assertEqual(data["columns_by"], "category")
+        self.assertEqual(data["start"], "2020-01-01")
+        self.assertEqual(data["end"], "2020-03-31")
+        self.assertEqual(data["rows"], [1, 2])
+        self.assertEqual(data["columns"], ["infection_control", "medication"])
+        self.assertEqual(data["values"], [2, 1, 0, 1])
+
+        _, matrix = self.get_heatmap(period="month", metric="severity", start="2020-01-01", end="2020-01-31")
+        self.assertEqual(matrix, {1: {"infection_control": 5, "medication": 1}})
+
+    def test_heatmap_by_period(self):
+        """Test that weekly and monthly period columns form a continuous axis"""
+        self.ingest_sample_findings()
+
+        data, matrix = self.get_heatmap(period="week", columns="period", category="infection_control", start="2020-01-01", end="2020-01-31")
+        self.assertEqual(data["columns_by"], "period")
+        self.assertEqual(data["columns"], ["2019-12-30", "2020-01-06", "2020-01-13", "2020-01-20", "2020-01-27"])
+        self.assertEqual(matrix, {1: {"2019-12-30": 0, "2020-01-06": 1, "2020-01-13": 0, "2020-01-20": 1, "2020-01-27": 0}})
+
+        data, matrix = self.get_heatmap(period="month", columns="period", start="2020-01-01", end="2020-03-31")
+        self.assertEqual(data["columns"], ["2020-01-01", "2020-02-01", "2020-03-01"])
+        self.assertEqual(matrix[1], {"2020-01-01": 3, "2020-02-01": 0, "2020-03-01": 0})
+        self.assertEqual(matrix[2], {"2020-01-01": 0, "2020-02-01": 0, "2020-03-01": 1})
+
+    def test_heatmap_category_filter(self):
+        """Test that the category filter limits the heatmap columns"""
+        self.ingest_sample_findings()
+
+        data, matrix = self.get_heatmap(category="medication", start="2020-01-01", end="2020-03-31")
+        self.assertEqual(data["columns"], ["medication"])
+        self.assertEqual(matrix, {1: {"medication": 1}, 2: {"medication": 1}})
+
+    def test_rollup_rebuild(self):
+        """Test that rebuilding the rollups from raw findings repairs drifted totals"""
+        from inspection_rollups import rebuild_inspection_rollups
+        self.ingest_sample_findings()
+
+        with sqlite3.connect(self.database.DATABASE_PATH) as conn:
+            conn.execute("UPDATE inspection_finding_rollups SET finding_count = 99, severity_total = 99")
+            rebuild_inspection_rollups(conn)
+
+        _, matrix = self.get_heatmap(period="week", metric="severity", columns="period", start="2020-01-06", end="2020-01-26")
+        self.assertEqual(matrix[1], {"2020-01-06": 4, "2020-01-13": 0, "2020-01-20": 2})
+
+    def test_ingest_validation(self):
+        """Test that invalid findings are rejected without being stored"""
+        finding = {"external_id": "v-1", "facility_id": 1, "category": "medication", "inspected_on": "2020-01-06"}
+
+        response = self.ingest([dict(finding, severity=0)])
+        self.assertEqual(response.status_code, 422)
+
+        response = self.ingest([dict(finding, category="  ")])
+        self.assertEqual(response.status_code, 422)
+
+        response = self.ingest([finding, dict(finding, external_id="v-2", facility_id=999)])
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("999", response.json()["detail"])
+
+        data, _ = self.get_heatmap()
+        self.assertEqual(data["rows"], [])
+
+    def test_heatmap_validation(self):
+        """Test that invalid heatmap parameters are rejected"""
+        invalid_params = (
+            {"period": "day"},
+            {"metric": "average"},
+            {"columns": "severity"},
+            {"start": "2020-03-15", "end": "2020-01-01"},
+            {"columns": "period", "start": "2020-01-01"},
+            {"columns": "period", "period": "week", "start": "2000-01-01", "end": "2020-01-01"}
+        )
+        for params in invalid_params:
+            response = self.client.get("/api/inspection-findings/heatmap", params=params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def tearDown(self):
+        """Stop the client and remove the temporary database"""
+        self.client.__exit__(None, None, None)
+        self.database.DATABASE_PATH = self.original_database_path
+        shutil.rmtree(self.temp_dir)
+
 if __name__ == "__main__":
     unittest.main()